@@ -6,4 +6,6 @@ __all__ = [
     "uci_engine",
     "stockfish_filter",
     "mcts_core",
+    "tt",
+    "engine_pool",
 ]
@@ -0,0 +1,97 @@
+import os
+from typing import List, Optional
+
+from .uci_engine import UCIEngine, UCIEnginePool
+from .stockfish_filter import StockfishFilter
+from .mcts_core import MCTS
+
+# ---- Engine Pool ----
+# Root parallelization: tiap worker punya proses Stockfish (Threads=1),
+# StockfishFilter (TT sendiri) dan MCTS sendiri. Posisi yang beda tidak
+# berbagi tree, jadi bisa dijalankan paralel tanpa sinkronisasi.
+# Thread sudah cukup karena waktu habis untuk menunggu I/O subprocess.
+# Antrian worker, map() dan quit() diwarisi dari UCIEnginePool. Default-nya pool
+# memiliki engine-nya sendiri; dengan shared=True engine diambil dari cache
+# UCIEngine.get sehingga pool baru di run berikutnya memakai proses yang sama
+# (quit() tidak mematikannya, engine di-quit saat exit).
+
+
+class HybridWorker:
+    def __init__(
+        self,
+        worker_id: int,
+        engine: UCIEngine,
+        sf_filter: StockfishFilter,
+        mcts: MCTS,
+        helper_engines: Optional[List[UCIEngine]] = None,
+    ):
+        self.worker_id = worker_id
+        self.engine = engine
+        self.sf_filter = sf_filter
+        self.mcts = mcts
+        # engine tambahan untuk tree parallelization di dalam MCTS worker ini
+        self.helper_engines = list(helper_engines or [])
+
+    def new_search(self):
+        """
+        Posisi root baru: aging TT semua filter milik worker ini tanpa clear.
+        """
+        for f in [self.sf_filter] + self.mcts.helper_filters:
+            f.tt.new_search()
+
+
+class EnginePool(UCIEnginePool):
+    def __init__(
+        self,
+        path: str,
+        n_workers: Optional[int] = None,
+        ucb_c: float = 1.5,
+        engines_per_worker: int = 1,
+        virtual_loss: int = 3,
+        pin_cpus: bool = True,
+        shared: bool = False,
+        **filter_kwargs,
+    ):
+        """
+        path               : path executable stockfish
+        n_workers          : jumlah worker (root parallelization); default = jumlah core
+        engines_per_worker : jumlah proses engine per worker; > 1 = tree parallelization
+                             dengan virtual loss di MCTS worker tsb
+        pin_cpus           : pin tiap proses engine ke satu core (lihat next_cpu)
+        shared             : ambil engine dari cache UCIEngine.get, jadi pool yang dibuat
+                             ulang di run berikutnya tidak men-spawn ulang Stockfish
+        filter_kwargs      : diteruskan ke StockfishFilter (threshold_cp, top_k, depth, ...)
+        """
+        if not n_workers:
+            n_workers = os.cpu_count() or 1
+
+        # dipakai _make_slots, yang dipanggil dari UCIEnginePool.__init__
+        self.ucb_c = ucb_c
+        self.engines_per_worker = max(1, engines_per_worker)
+        self.virtual_loss = virtual_loss
+        self.filter_kwargs = filter_kwargs
+
+        super().__init__(path, n=n_workers * self.engines_per_worker,
+                         name="stockfish", pin_cpus=pin_cpus, shared=shared)
+        self.workers: List[HybridWorker] = self.slots
+
+    def _make_slots(self, engines: List[UCIEngine]) -> List[HybridWorker]:
+        """
+        Kelompokkan engine per engines_per_worker menjadi HybridWorker.
+        """
+        epw = self.engines_per_worker
+        workers = []
+        for i in range(len(engines) // epw):
+            group = engines[i * epw:(i + 1) * epw]
+            filters = [StockfishFilter(engine=e, **self.filter_kwargs) for e in group]
+            mcts = MCTS(
+                sf_filter=filters[0],
+                ucb_c=self.ucb_c,
+                helper_filters=filters[1:],
+                virtual_loss=self.virtual_loss,
+            )
+            workers.append(HybridWorker(i, group[0], filters[0], mcts, helper_engines=group[1:]))
+        return workers
+
+    def _slot_engine(self, worker: HybridWorker) -> UCIEngine:
+        return worker.engine
@@ -1,64 +1,201 @@
-import math
-from typing import Dict, Optional, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Mapping, Optional, List
 from dataclasses import dataclass, field
 import chess
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba opsional: tanpa numba, kernel UCB pakai versi NumPy di bawah
+    njit = None
 
 from .stockfish_filter import StockfishFilter
 
+# ---- Kernel UCB ----
+# UCB = Q + C * P * sqrt(N_parent) / (1 + N_move), Q = W / max(N, 1) (0 untuk move yang belum dikunjungi).
+# Kernel murni aritmatika di atas array SoA + mask bool (tanpa python-chess),
+# jadi bisa di-compile Numba. mask: langkah yang lolos StockfishFilter.
+def _argmax_ucb_loop(W, N, P, sqrt_N_parent, c, mask):
+    best = -1
+    best_score = -np.inf
+    for i in range(N.shape[0]):
+        if mask[i]:
+            n = N[i]
+            score = W[i] / max(n, 1) + c * P[i] * sqrt_N_parent / (1 + n)
+            if score > best_score:
+                best = i
+                best_score = score
+    return best
+
+def _argmax_ucb_numpy(W, N, P, sqrt_N_parent, c, mask):
+    ucb = W / np.maximum(N, 1) + c * P * sqrt_N_parent / (1 + N)
+    return int(np.argmax(np.where(mask, ucb, -np.inf)))
+
+if njit is not None:
+    argmax_ucb = njit(cache=True)(_argmax_ucb_loop)
+else:
+    argmax_ucb = _argmax_ucb_numpy
+
 # ---- Prior Provider ----
 # Untuk sekarang masih uniform.
 # Nanti kalau kamu mau pakai Lc0 sebagai policy prior,
 # kamu bisa ganti ini dengan output probabilitas langkah dari Lc0.
+class _UniformPrior:
+    """
+    Prior uniform 1/n untuk semua move, tanpa alokasi dict per node.
+    Cukup mendukung lookup ala dict (get / [] / len) yang dipakai filter.
+    Satu instance per n (di-intern oleh PriorProvider), termasuk array P read-only
+    yang dibagi ke semua node dengan jumlah legal move yang sama.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.p = 1.0 / n
+        self.arr = np.full(n, self.p, dtype=np.float32)
+        self.arr.flags.writeable = False
+
+    def __getitem__(self, mv: chess.Move) -> float:
+        return self.p
+
+    def get(self, mv: chess.Move, default: Optional[float] = None) -> float:
+        return self.p
+
+    def __len__(self) -> int:
+        return self.n
+
+
 class PriorProvider:
     def __init__(self):
-        pass
+        self._uniform: Dict[int, _UniformPrior] = {}
 
-    def get_prior(self, board: chess.Board, moves: List[chess.Move]) -> Dict[chess.Move, float]:
+    def get_prior(self, board: chess.Board, moves: List[chess.Move]) -> Mapping[chess.Move, float]:
         if not moves:
             return {}
-        p = 1.0 / len(moves)
-        return {m: p for m in moves}
+        n = len(moves)
+        prior = self._uniform.get(n)
+        if prior is None:
+            prior = self._uniform.setdefault(n, _UniformPrior(n))
+        return prior
 
 # ---- Node Struktur untuk MCTS ----
-@dataclass
+# Statistik child disimpan per node sebagai parallel arrays (SoA) per slot move,
+# jadi UCB bisa dihitung satu ekspresi NumPy tanpa lookup dict per move.
+# slots=True (Python >= 3.10): tanpa __dict__ per node, akses atribut di backprop/seleksi lebih cepat.
+@dataclass(slots=True)
 class MCTSNode:
-    board: chess.Board
+    # Hanya root yang menyimpan board; child cukup simpan move dari parent.
+    # Posisi child direkonstruksi lewat push/pop di satu work board saat seleksi.
+    board: Optional[chess.Board] = None
     parent: Optional["MCTSNode"] = None
     move: Optional[chess.Move] = None  # langkah dari parent -> node ini
-    children: Dict[chess.Move, "MCTSNode"] = field(default_factory=dict)
+    idx: int = -1                      # slot move ini di parent.moves
 
     N: int = 0      # visit count
     W: float = 0.0  # total value (dari perspektif player yg akan jalan di parent)
-    P: Dict[chess.Move, float] = field(default_factory=dict)
 
-    terminal: bool = False
+    P: Mapping[chess.Move, float] = field(default_factory=dict)  # prior per move (dipakai filter)
 
-    def legal_moves(self) -> List[chess.Move]:
-        return list(self.board.legal_moves)
+    # status terminal di-cache saat pertama dicek (lihat is_terminal)
+    terminal: Optional[bool] = None
+    terminal_value: Optional[float] = None
 
-    def Q(self, mv: chess.Move) -> float:
+    # SoA per slot move, diisi lazy saat kunjungan pertama (lihat expand)
+    moves: Optional[List[chess.Move]] = None
+    N_arr: Optional[np.ndarray] = None   # int32, visit count tiap child
+    W_arr: Optional[np.ndarray] = None   # float32, total value tiap child
+    P_arr: Optional[np.ndarray] = None   # float32, prior tiap move
+    children_arr: List[Optional["MCTSNode"]] = field(default_factory=list)
+    allowed: Optional[np.ndarray] = None  # bool per slot: lolos StockfishFilter (di-cache, lihat _select_child_filtered)
+
+    # memo legal_moves() sebelum expand
+    _legal: Optional[List[chess.Move]] = field(default=None, repr=False)
+
+    def legal_moves(self, board: Optional[chess.Board] = None) -> List[chess.Move]:
+        """
+        board: posisi node ini (work board saat seleksi); default self.board (root).
+        Dihitung sekali per node lalu di-memo (posisi node tidak pernah berubah),
+        jadi is_terminal dan expand berbagi list yang sama.
+        """
+        if self.moves is not None:
+            return self.moves
+        if self._legal is None:
+            if board is None:
+                board = self.board
+            self._legal = list(board.legal_moves)
+        return self._legal
+
+    def is_terminal(self, board: chess.Board) -> bool:
         """
-        Nilai rata-rata dari child move tsb.
-        Kalau belum pernah dikunjungi, return 0.0
+        board: posisi node ini (work board saat seleksi).
+        Game over dicek sekali saja per node, sekaligus simpan value terminalnya
+        (+1 / -1 / 0 dari sudut pandang side-to-move). Kunjungan berikutnya cukup baca atribut.
+        Sama dengan board.outcome(claim_draw=False), tapi checkmate/stalemate dibaca dari
+        legal move yang di-memo, bukan generate ulang.
         """
-        child = self.children.get(mv)
-        if (not child) or child.N == 0:
-            return 0.0
-        return child.W / child.N
+        if self.terminal is None:
+            if not self.legal_moves(board):
+                # checkmate: side-to-move kalah, stalemate: draw
+                self.terminal = True
+                self.terminal_value = -1.0 if board.is_check() else 0.0
+            elif (board.is_insufficient_material()
+                  or board.is_seventyfive_moves()
+                  or board.is_fivefold_repetition()):
+                self.terminal = True
+                self.terminal_value = 0.0
+            else:
+                self.terminal = False
+        return self.terminal
 
-    def N_move(self, mv: chess.Move) -> int:
+    def expand(self, moves: List[chess.Move], priors: Mapping[chess.Move, float]):
         """
-        Berapa kali move ini dieksplor.
+        Alokasi array statistik untuk semua legal move node ini.
+        Prior uniform memakai array P bersama (read-only), bukan alokasi baru.
         """
-        child = self.children.get(mv)
-        return child.N if child else 0
+        b = len(moves)
+        self.moves = moves
+        self._legal = None
+        self.P = priors
+        self.N_arr = np.zeros(b, dtype=np.int32)
+        self.W_arr = np.zeros(b, dtype=np.float32)
+        if isinstance(priors, _UniformPrior):
+            self.P_arr = priors.arr
+        else:
+            self.P_arr = np.array([priors.get(m, 0.0) for m in moves], dtype=np.float32)
+        self.children_arr = [None] * b
 
 # ---- MCTS Inti ----
 class MCTS:
-    def __init__(self, sf_filter: StockfishFilter, ucb_c: float = 1.5):
+    def __init__(
+        self,
+        sf_filter: StockfishFilter,
+        ucb_c: float = 1.5,
+        helper_filters: Optional[List[StockfishFilter]] = None,
+        virtual_loss: int = 3,
+        n_sim: int = 1600,
+    ):
+        """
+        helper_filters : filter tambahan, masing-masing dengan UCIEngine sendiri.
+                         Kalau ada, run_simulations pakai tree parallelization:
+                         1 thread per filter, semua berbagi tree yang sama.
+        virtual_loss   : penalti sementara untuk slot yang sedang ditelusuri thread lain,
+                         supaya thread-thread menyebar ke cabang berbeda.
+        n_sim          : perkiraan jumlah simulasi per root, untuk ukuran awal tabel sqrt
+                         (diperbesar otomatis di run_simulations kalau kurang).
+        """
         self.sf_filter = sf_filter
         self.ucb_c = ucb_c
         self.priors = PriorProvider()
+        self.helper_filters = list(helper_filters or [])
+        self.virtual_loss = virtual_loss
+        # satu lock untuk semua mutasi tree; call Stockfish (I/O) selalu di luar lock
+        self._tree_lock = threading.Lock()
+        # sqrt(N_parent) untuk UCB: N_parent integer kecil (<= total simulasi), jadi cukup lookup tabel
+        self._sqrt_lut = np.sqrt(np.arange(n_sim + 2, dtype=np.float32))
+
+    def _ensure_sqrt_lut(self, max_n: int):
+        if max_n >= len(self._sqrt_lut):
+            self._sqrt_lut = np.sqrt(np.arange(max_n + 2, dtype=np.float32))
 
     # Time complexity notes:
     # - Let b be the average branching factor (legal moves per position).
@@ -67,136 +204,180 @@ class MCTS:
     # - Let T_sf be the cost of a single Stockfish evaluation (depends on engine and depth; typically exponential in search depth).
     #
     # Per simulation (one MCTS iteration) the main costs are:
-    #  1) Selection: sorting legal moves by UCB -> O(b log b) to sort, then calling StockfishFilter
-    #  2) StockfishFilter.filter_moves: evaluates up to top_k moves -> O(top_k * T_sf)
+    #  1) Selection: StockfishFilter call, then one vectorized UCB + argmax over kept moves -> O(b)
+    #  2) StockfishFilter.filter_moves: one MultiPV search scoring top_k moves -> O(T_sf),
+    #     only on the first visit of a node (the kept mask is cached on the node afterwards)
     #  3) Recursing down the tree during selection/expansion roughly d steps -> O(d) (not counting SF evals)
     #  4) Backpropagation: O(d)
     #
-    # Therefore, time per simulation = O(b log b + top_k * T_sf + d).
-    # For n_sim simulations: O(n_sim * (b log b + top_k * T_sf + d)).
-    # In practice the dominant term is top_k * T_sf if Stockfish is invoked at each selection step.
+    # Therefore, time per simulation = O(b + T_sf + d) in the worst case (every node visited is new).
+    # For n_sim simulations: O(n_sim * (b + d) + U * T_sf), U = number of distinct nodes filtered (U <= n_sim * d).
+    # In practice the dominant term is still U * T_sf, but re-visits of explored nodes no longer call Stockfish.
 
-    def _ucb_score(self, node: MCTSNode, mv: chess.Move) -> float:
-        """
-        UCB = Q + C * P * sqrt(N_parent) / (1 + N_move)
-        """
-        Q = node.Q(mv)
-        P = node.P.get(mv, 0.0)
-        N_parent = max(1, node.N)
-        N_child  = node.N_move(mv)
-        return Q + self.ucb_c * P * math.sqrt(N_parent) / (1 + N_child)
-
-    def _select_child_filtered(self, node: MCTSNode) -> Optional[chess.Move]:
+    def _select_child_filtered(
+        self,
+        node: MCTSNode,
+        board: chess.Board,
+        sf_filter: StockfishFilter,
+        vloss: int = 0,
+    ) -> Optional[int]:
         """
         Tahap Selection:
-        1. Urutkan move berdasarkan skor UCB (ekspansi MCTS).
-        2. Kirim kandidat ke StockfishFilter untuk buang langkah buruk.
-        3. Ambil langkah terbaik pertama yang masih 'boleh'.
+        1. Kirim kandidat ke StockfishFilter (diurutkan pakai prior) untuk buang langkah buruk.
+           Hanya di kunjungan pertama node; kunjungan berikutnya pakai mask node.allowed.
+        2. Dari langkah yang lolos, ambil yang skor UCB-nya paling tinggi (argmax vektor).
         Ini bagian yang bikin sistemmu 'hybrid MCTS + Alpha-Beta'.
+        board: posisi node saat ini (work board milik thread ini).
+        vloss: virtual loss yang langsung dipasang di slot terpilih (0 = single thread).
+        Return: index slot move di node.moves, atau None.
         """
-        legal = node.legal_moves()
+        # Pastikan array statistik + prior tersedia
+        with self._tree_lock:
+            if node.moves is None:
+                legal = node.legal_moves(board)
+                node.expand(legal, self.priors.get_prior(board, legal))
+        legal = node.moves
         if not legal:
             return None
 
-        # Pastikan prior tersedia
-        if not node.P:
-            node.P = self.priors.get_prior(node.board, legal)
-
-        # Urutkan moves dari yang paling menjanjikan menurut UCB
-        sorted_by_ucb = sorted(
-            legal,
-            key=lambda mv: self._ucb_score(node, mv),
-            reverse=True
-        )
-
-        # Minta filter Stockfish untuk prune langkah jelek
-        kept = self.sf_filter.filter_moves(
-            node.board,
-            sorted_by_ucb,
-            node.P
-        )
-
-        if not kept:
-            return None
+        # Minta filter Stockfish untuk prune langkah jelek, cukup sekali per node:
+        # posisi node tidak berubah, jadi hasil filter di kunjungan pertama di-cache sebagai mask
+        allowed_mask = node.allowed
+        if allowed_mask is None:
+            kept = sf_filter.filter_moves(
+                board,
+                legal,
+                node.P
+            )
+            kept_set = set(kept)
+            allowed_mask = np.fromiter((mv in kept_set for mv in legal), dtype=bool, count=len(legal))
+            node.allowed = allowed_mask
 
-        # pilih langkah pertama yang lolos filter
-        for mv in sorted_by_ucb:
-            if mv in kept:
-                return mv
+        if not allowed_mask.any():
+            return None
 
-        # fallback (harusnya jarang kejadian)
-        return kept[0]
+        # argmax UCB di antara langkah yang lolos filter
+        with self._tree_lock:
+            sqrt_N_parent = self._sqrt_lut[max(1, node.N)]
+            idx = int(argmax_ucb(node.W_arr, node.N_arr, node.P_arr, sqrt_N_parent, self.ucb_c, allowed_mask))
+            if vloss:
+                node.N_arr[idx] += vloss
+                node.W_arr[idx] -= vloss
+        return idx
 
-    def _rollout_value(self, node: MCTSNode) -> float:
+    def _rollout_value(self, node: MCTSNode, board: chess.Board) -> float:
         """
         Rollout/value function.
         Versi paling sederhana:
-        - Jika posisi terminal, kasih +1 / -1 / 0.
+        - Jika posisi terminal, kasih +1 / -1 / 0 (di-cache di node).
         - Kalau belum terminal, kita pakai 0 sementara.
         Catatan:
-        Value selalu dari sudut pandang side-to-move di node ini.
-        """
-        if node.board.is_game_over():
-            res = node.board.result()  # "1-0", "0-1", "1/2-1/2"
-            if res == "1-0":
-                return 1.0 if node.board.turn == chess.WHITE else -1.0
-            elif res == "0-1":
-                return 1.0 if node.board.turn == chess.BLACK else -1.0
-            else:
-                return 0.0
+        Value selalu dari sudut pandang side-to-move di board (posisi leaf).
+        """
+        if node.is_terminal(board):
+            return node.terminal_value
         # placeholder: nanti bisa diganti static eval cepat
         return 0.0
 
-    def _backpropagate(self, leaf: MCTSNode, value: float):
+    def _backpropagate(self, path: List[MCTSNode], value: float, vloss: int = 0):
         """
-        Kembali dari leaf ke root, update:
+        Update semua node di path (root -> leaf) hasil seleksi:
         - N (visit count)
         - W (total value)
-        dan bolak-balik tanda value karena giliran pemain berganti.
+        dan bolak-balik tanda value karena giliran pemain berganti
+        (leaf dapat +value, parent-nya -value, dst).
+        Statistik slot di parent (N_arr/W_arr) ikut di-update,
+        sekaligus membatalkan virtual loss yang dipasang saat seleksi.
         """
-        node = leaf
-        v = value
-        while node is not None:
-            node.N += 1
-            node.W += v
-            v = -v
-            node = node.parent
+        # root -> leaf: leaf dapat +value, jadi root mulai dari tanda sesuai paritas panjang path
+        v = value if len(path) % 2 == 1 else -value
+        with self._tree_lock:
+            parent = None
+            for node in path:
+                node.N += 1
+                node.W += v
+                if parent is not None:
+                    parent.N_arr[node.idx] += 1 - vloss
+                    parent.W_arr[node.idx] += v + vloss
+                parent = node
+                v = -v
 
-    def run_simulations(self, root: MCTSNode, n_sim: int = 200):
-        for _ in range(n_sim):
-            node = root
+    def _simulate(self, root: MCTSNode, work_board: chess.Board, sf_filter: StockfishFilter, vloss: int = 0):
+        """
+        Satu iterasi MCTS. work_board harus di posisi root, dan dikembalikan ke root di akhir.
+        """
+        node = root
+        path = [root]
 
-            # ===== 1. SELECTION (dengan filter Stockfish) =====
-            while True:
-                # kalau posisi game over, stop
-                if node.board.is_game_over():
-                    node.terminal = True
-                    break
+        # ===== 1. SELECTION (dengan filter Stockfish) =====
+        while True:
+            # kalau posisi game over, stop (cukup baca cache setelah kunjungan pertama)
+            if node.is_terminal(work_board):
+                break
 
-                mv = self._select_child_filtered(node)
-                if mv is None:
-                    # tidak ada langkah yang lolos filter
-                    break
+            idx = self._select_child_filtered(node, work_board, sf_filter, vloss)
+            if idx is None:
+                # tidak ada langkah yang lolos filter
+                break
 
+            mv = node.moves[idx]
+            work_board.push(mv)
+
+            with self._tree_lock:
+                child = node.children_arr[idx]
                 # node child belum pernah dibuat → ini frontier
-                if mv not in node.children:
-                    new_board = node.board.copy()
-                    new_board.push(mv)
-                    child = MCTSNode(board=new_board, parent=node, move=mv)
-                    node.children[mv] = child
-                    node = child
-                    break
+                if child is None:
+                    child = MCTSNode(parent=node, move=mv, idx=idx)
+                    node.children_arr[idx] = child
+                    frontier = True
                 else:
-                    # sudah ada, lanjut lebih dalam
-                    node = node.children[mv]
+                    frontier = False
+            node = child
+            path.append(node)
+            if frontier:
+                break
+            # sudah ada, lanjut lebih dalam
+
+        # ===== 2. (EXPANSION implicit di atas saat bikin child baru) =====
+
+        # ===== 3. ROLLOUT / STATIC EVAL =====
+        value = self._rollout_value(node, work_board)
 
-            # ===== 2. (EXPANSION implicit di atas saat bikin child baru) =====
+        # ===== 4. BACKPROP =====
+        self._backpropagate(path, value, vloss)
 
-            # ===== 3. ROLLOUT / STATIC EVAL =====
-            value = self._rollout_value(node)
+        # balikin work board ke posisi root
+        for _ in range(len(path) - 1):
+            work_board.pop()
+
+    def run_simulations(self, root: MCTSNode, n_sim: int = 200):
+        filters = [self.sf_filter] + self.helper_filters
+        # N node mana pun <= root.N, dan root.N naik paling banyak n_sim
+        self._ensure_sqrt_lut(root.N + n_sim)
+
+        if len(filters) == 1:
+            # satu board mutable untuk semua simulasi: push saat turun, pop setelah backprop
+            work_board = root.board.copy()
+            for _ in range(n_sim):
+                self._simulate(root, work_board, self.sf_filter)
+            return
+
+        # tree parallelization: tiap thread punya engine + work board sendiri,
+        # selama thread A menunggu Stockfish, thread B tetap bisa seleksi
+        remaining = [n_sim]
+
+        def worker(sf_filter: StockfishFilter):
+            work_board = root.board.copy()
+            while True:
+                with self._tree_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                self._simulate(root, work_board, sf_filter, self.virtual_loss)
 
-            # ===== 4. BACKPROP =====
-            self._backpropagate(node, value)
+        with ThreadPoolExecutor(max_workers=len(filters)) as ex:
+            for fut in [ex.submit(worker, f) for f in filters]:
+                fut.result()
 
     def best_move(self, root: MCTSNode) -> Optional[chess.Move]:
         """
@@ -204,6 +385,6 @@ class MCTS:
         Ini langkah yang nanti kamu klaim sebagai
         keputusan akhir sistem hybrid.
         """
-        if not root.children:
+        if root.N_arr is None or not root.N_arr.any():
             return None
-        return max(root.children.items(), key=lambda kv: kv[1].N)[0]
+        return root.moves[int(root.N_arr.argmax())]
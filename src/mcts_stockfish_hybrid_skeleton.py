@@ -5,11 +5,11 @@ Hybrid MCTS + Stockfish Filter Skeleton
 
 import os
 import sys
+from typing import Optional
 import chess
 
-from .uci_engine import UCIEngine
-from .stockfish_filter import StockfishFilter
-from .mcts_core import MCTS, MCTSNode
+from .mcts_core import MCTSNode
+from .engine_pool import EnginePool, HybridWorker
 
 # ==== KONFIGURASI UTAMA ====
 STOCKFISH_PATH = r"D:\stockfish-windows-x86-64-avx2\stockfish-windows-x86-64-avx2.exe"
@@ -21,6 +21,8 @@ THRESHOLD_CP = -100      # prune langkah jelek
 TOP_K = 8                # evaluasi hanya K langkah terbaik dulu
 USE_MOVETIME = False     # False = pakai depth fix
 SF_MOVETIME_MS = 20
+N_WORKERS = None         # jumlah proses stockfish paralel; None = min(jumlah FEN, jumlah core)
+ENGINES_PER_WORKER = 1   # > 1 = tree parallelization (virtual loss) di tiap worker
 
 EXAMPLE_FENS = [
     # posisi awal
@@ -29,15 +31,27 @@ EXAMPLE_FENS = [
     "r2q1rk1/pp2bppp/2n1pn2/2bp4/3P4/2N1PN2/PPQ1BPPP/R1B2RK1 w - - 0 10",
 ]
 
-def run_demo():
-    # init engine stockfish
-    sf = UCIEngine(STOCKFISH_PATH, name="stockfish")
+def _solve_fen(worker: HybridWorker, fen: str) -> Optional[chess.Move]:
+    board = chess.Board(fen)
+    root = MCTSNode(board=board)
+    # posisi root baru: aging TT tanpa clear
+    worker.new_search()
+
+    # jalankan simulasi MCTS hybrid
+    worker.mcts.run_simulations(root, n_sim=N_SIMULATIONS)
 
-    # (opsional) supaya cepat / konsisten
-    sf.setoption("Threads", "1")
+    # pilih langkah terbaik versi MCTS
+    return worker.mcts.best_move(root)
 
-    sf_filter = StockfishFilter(
-        engine=sf,
+def run_demo():
+    # pool engine stockfish: tiap worker 1 proses (Threads=1) + filter + MCTS sendiri
+    # engine diambil dari cache UCIEngine.get: run berikutnya tidak men-spawn ulang Stockfish
+    pool = EnginePool(
+        STOCKFISH_PATH,
+        n_workers=N_WORKERS or min(len(EXAMPLE_FENS), os.cpu_count() or 1),
+        ucb_c=1.5,
+        engines_per_worker=ENGINES_PER_WORKER,
+        shared=True,
         threshold_cp=THRESHOLD_CP,
         top_k=TOP_K,
         use_movetime=USE_MOVETIME,
@@ -45,30 +59,17 @@ def run_demo():
         depth=MAX_DEPTH,
     )
 
-    mcts = MCTS(
-        sf_filter=sf_filter,
-        ucb_c=1.5,
-    )
+    # tiap FEN tree-nya independen -> bisa paralel
+    results = pool.map(_solve_fen, EXAMPLE_FENS)
 
-    for fen in EXAMPLE_FENS:
+    for fen, best in zip(EXAMPLE_FENS, results):
         print("=====================================")
         print("FEN :", fen)
-
-        board = chess.Board(fen)
-        root = MCTSNode(board=board)
-
-        # jalankan simulasi MCTS hybrid
-        mcts.run_simulations(root, n_sim=N_SIMULATIONS)
-
-        # pilih langkah terbaik versi MCTS
-        best = mcts.best_move(root)
         if best is None:
             print("No move found (terminal?)")
         else:
             print("Best move (UCI):", best.uci())
 
-    sf.quit()
-
 
 if __name__ == "__main__":
     if not os.path.exists(STOCKFISH_PATH):
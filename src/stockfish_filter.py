@@ -1,6 +1,9 @@
-from typing import Dict, List
+import heapq
+from typing import Dict, List, Mapping, Optional
 import chess
+import chess.polyglot
 from .uci_engine import UCIEngine
+from .tt import TT, value_to_tt
 
 class StockfishFilter:
     def __init__(
@@ -11,11 +14,14 @@ class StockfishFilter:
         use_movetime: bool = False,
         movetime_ms: int = 20,
         depth: int = 8,
+        tt_mb: int = 16,
     ):
         """
         threshold_cp : langkah dengan eval < threshold_cp akan dipruning
+                       (cp dari sudut pandang pemain yang jalan di board parent)
         top_k        : hanya evaluasi K langkah teratas (hemat waktu)
         depth        : batas kedalaman pencarian (ply) -> sesuai batas proposal (<= 8)
+        tt_mb        : ukuran transposition table untuk cache evaluasi (MB)
         """
         self.engine = engine
         self.threshold_cp = threshold_cp
@@ -23,54 +29,95 @@ class StockfishFilter:
         self.use_movetime = use_movetime
         self.movetime_ms = movetime_ms
         self.depth = depth
-        self.cache: Dict[str, int] = {}  # caching evaluasi per-FEN
+        # caching evaluasi per-posisi, key = Zobrist hash 64-bit
+        # TT ukuran tetap, bertahan antar FEN (panggil tt.new_search() tiap ganti root)
+        self.tt = TT(tt_mb)
 
     def eval_board(self, board: chess.Board) -> int:
-        fen = board.fen()
-        if fen in self.cache:
-            return self.cache[fen]
+        key = chess.polyglot.zobrist_hash(board)
+        search_depth = 0 if self.use_movetime else self.depth
+        cp_score = self.tt.probe(key, search_depth)
+        if cp_score is not None:
+            return cp_score
 
-        self.engine.position_fen(fen)
-        cp_score, mate_score, _ = self.engine.go_and_get(
+        # FEN cuma dibangun kalau cache miss; position + go dikirim dalam satu write
+        fen, moves = self.engine.board_position(board)
+        cp_score, mate_score, bestmove = self.engine.position_and_go(
+            fen,
+            moves,
             movetime_ms=self.movetime_ms if self.use_movetime else None,
             depth=None if self.use_movetime else self.depth
         )
 
-        self.cache[fen] = cp_score
+        # kuantisasi ke int16 (mate -> +/-(32000 - plies)) supaya sama persis dengan isi TT
+        cp_score = value_to_tt(cp_score, mate_score)
+        try:
+            move = chess.Move.from_uci(bestmove)
+        except ValueError:  # "(none)" di posisi terminal
+            move = None
+        self.tt.store(key, cp_score, search_depth, move)
         return cp_score
 
+    def multipv_eval(self, board: chess.Board, searchmoves: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Satu kali search di posisi parent dengan MultiPV = top_k.
+        searchmoves : batasi search ke langkah-langkah ini saja (UCI), maks top_k; None = semua
+        Return {uci_move: cp} dari sudut pandang side-to-move di board.
+        """
+        # parent dikirim sebagai root FEN + move dari root (lihat UCIEngine.position_board).
+        # MultiPV = top_k hanya untuk search ini; eval_board dkk. tetap search single-PV
+        return self.engine.go_with_searchmoves(
+            board,
+            searchmoves,
+            movetime_ms=self.movetime_ms if self.use_movetime else None,
+            depth=None if self.use_movetime else self.depth,
+            n_pv=self.top_k
+        )
+
     # Complexity notes for eval_board and filter_moves:
     # - eval_board: single Stockfish evaluation triggered via UCI. Cost depends on engine search mode
     #   (depth or movetime). Classical alpha-beta search is exponential in search depth, so we denote
     #   a single evaluation cost as T_sf (function of depth/movetime and engine internals).
     # - filter_moves:
-    #    * ordering by prior: O(m log m) where m = len(candidate_moves)
-    #    * evaluating top_k moves: O(top_k * T_sf)
-    #    * overall: O(m log m + top_k * T_sf)
+    #    * ordering candidates by prior and taking top_k: O(m log top_k), skipped if uniform
+    #      (m = len(candidate_moves))
+    #    * scoring them: one MultiPV search on the parent restricted with "searchmoves" -> O(T_sf')
+    #      where T_sf' is a single search with MultiPV = top_k (shared tree, so much cheaper than top_k * T_sf)
+    #    * matching candidates to MultiPV output: O(m)
+    #    * overall: O(m + T_sf')
     #  In this project top_k is typically small (e.g. 8) to keep filter cost manageable.
 
     def filter_moves(
         self,
         board: chess.Board,
         candidate_moves: List[chess.Move],
-        priors: Dict[chess.Move, float],
+        priors: Mapping[chess.Move, float],
     ) -> List[chess.Move]:
         """
         Kembalikan subset dari candidate_moves yang "layak"
         menurut evaluasi Stockfish.
         """
-        # urutkan kandidat berdasarkan prior (kalau ada), biar kita evaluasi top-K dulu
-        if priors:
-            ordered = sorted(candidate_moves, key=lambda m: priors.get(m, 0.0), reverse=True)
+        if not candidate_moves:
+            return []
+
+        # kandidat diurutkan prior dulu, top_k teratas dikirim sebagai "go searchmoves":
+        # Stockfish cuma search langkah itu saja (satu tree, TT/killer tetap berbagi).
+        # Kalau prior uniform tidak ada yang perlu dibatasi: search biasa, Stockfish sendiri
+        # yang pilih top_k terbaik (command go pendek, key cache kecil).
+        if priors and len({priors.get(mv, 0.0) for mv in candidate_moves}) > 1:
+            ordered = heapq.nlargest(self.top_k, candidate_moves, key=lambda mv: priors.get(mv, 0.0))
+            searchmoves = [mv.uci() for mv in ordered]
         else:
-            ordered = candidate_moves[:]
+            ordered = candidate_moves
+            searchmoves = None
+        pv_scores = self.multipv_eval(board, searchmoves)
 
+        # langkah yang tidak muncul di output lebih buruk dari top_k (urutan prior tetap)
         scored = []
-        for mv in ordered[: self.top_k]:
-            board.push(mv)
-            cp_val = self.eval_board(board)
-            board.pop()
-            scored.append((mv, cp_val))
+        for mv in ordered:
+            cp_val = pv_scores.get(mv.uci())
+            if cp_val is not None:
+                scored.append((mv, cp_val))
 
         kept = [mv for (mv, cp_val) in scored if cp_val >= self.threshold_cp]
 
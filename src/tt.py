@@ -0,0 +1,137 @@
+import numpy as np
+from typing import Optional
+
+import chess
+
+# ---- Transposition Table ----
+# Meniru layout TT Stockfish (tt.cpp): tabel ukuran tetap, dibagi per cluster
+# berisi 3 entry. Index cluster diambil dari bit atas Zobrist key, 16 bit bawah
+# disimpan sebagai verifikasi. Generation dipakai untuk aging antar search,
+# jadi TT tidak perlu di-clear tiap ganti FEN.
+#
+# Entry dipacking 10 byte seperti TTEntry Stockfish, 3 entry + 2 byte padding
+# = cluster 32 byte, jadi satu probe cuma menyentuh satu cache line.
+
+CLUSTER_SIZE = 3
+
+TT_ENTRY_DTYPE = np.dtype([
+    ("key16", "<u2"),      # 16 bit bawah Zobrist key
+    ("move16", "<u2"),     # bestmove: from | to << 6 | promotion << 12 (0 = tidak ada)
+    ("value16", "<i2"),    # skor search (centipawn, side-to-move POV)
+    ("eval16", "<i2"),     # static eval (belum dipakai, EVAL_NONE)
+    ("gen_bound", "u1"),   # 5 bit atas generation, 3 bit bawah bound
+    ("depth", "i1"),       # depth + 1, 0 = entry kosong
+])
+
+TT_CLUSTER_DTYPE = np.dtype([
+    ("entry", TT_ENTRY_DTYPE, (CLUSTER_SIZE,)),
+    ("padding", "V2"),
+])
+
+CP_MAX = 32000     # batas skor yang muat di int16 (juga "mate in 0")
+EVAL_NONE = 32002  # sama dengan VALUE_NONE Stockfish
+
+BOUND_EXACT = 3          # skor yang disimpan selalu hasil search penuh
+GENERATION_BITS = 3      # bit bawah gen_bound dipakai bound
+GENERATION_DELTA = 1 << GENERATION_BITS
+GENERATION_MASK = (0xFF << GENERATION_BITS) & 0xFF
+
+
+def value_to_tt(cp: int, mate: Optional[int] = None) -> int:
+    """
+    Kuantisasi skor engine ke int16 untuk value16.
+    - skor mate (mate = jumlah move ke mate, UCI) -> +/-(CP_MAX - plies_to_mate), seperti Stockfish
+    - skor cp biasa di-clamp ke [-CP_MAX, CP_MAX]
+    """
+    if mate is not None:
+        if mate > 0:
+            return CP_MAX - (2 * mate - 1)
+        return -(CP_MAX + 2 * mate)
+    return max(min(cp, CP_MAX), -CP_MAX)
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+class TT:
+    def __init__(self, mb: int = 16):
+        """
+        mb : budget memori tabel dalam MB (dibulatkan ke bawah ke jumlah cluster power-of-two)
+        """
+        self.resize(mb)
+
+    def resize(self, mb: int):
+        cluster_bytes = TT_CLUSTER_DTYPE.itemsize
+        n = max(1, (mb * 1024 * 1024) // cluster_bytes)
+        self.cluster_bits = n.bit_length() - 1
+        self.n_clusters = 1 << self.cluster_bits
+        self._clusters = np.zeros(self.n_clusters, dtype=TT_CLUSTER_DTYPE)
+        # view (n_clusters, 3) ke entry di dalam cluster
+        self.table = self._clusters["entry"]
+        self.generation = 0
+        # view byte mentah dari tabel, dipakai clear()
+        self._raw = self._clusters.view(np.uint8)
+
+    def clear(self):
+        self._raw.fill(0)
+        self.generation = 0
+
+    def new_search(self):
+        """
+        Naikkan generation tanpa menghapus isi tabel (panggil tiap ganti posisi root).
+        """
+        self.generation = (self.generation + GENERATION_DELTA) & 0xFF
+
+    def _relative_age(self, gen_bound: int) -> int:
+        # jumlah generation sejak entry ditulis (wrap-around aman, seperti Stockfish)
+        return ((0xFF + GENERATION_DELTA + self.generation - gen_bound) & GENERATION_MASK) >> GENERATION_BITS
+
+    def _cluster_index(self, key: int) -> int:
+        return key >> (64 - self.cluster_bits) if self.cluster_bits else 0
+
+    def probe(self, key: int, depth: int = 0) -> Optional[int]:
+        """
+        Return cp kalau ada entry dengan key yang cocok dan depth >= depth yang diminta.
+        """
+        idx = self._cluster_index(key)
+        key16 = key & 0xFFFF
+        for i, (k16, _, value16, _, gen_bound, d8) in enumerate(self.table[idx].tolist()):
+            if d8 and k16 == key16:
+                if d8 - 1 < depth:
+                    return None
+                # refresh generation supaya entry yang masih dipakai tidak cepat diganti
+                self.table["gen_bound"][idx, i] = self.generation | (gen_bound & (GENERATION_DELTA - 1))
+                return value16
+        return None
+
+    def store(self, key: int, cp: int, depth: int = 0, move: Optional[chess.Move] = None):
+        """
+        cp sebaiknya sudah lewat value_to_tt (mate di-encode); di sini cuma di-clamp lagi.
+        """
+        idx = self._cluster_index(key)
+        key16 = key & 0xFFFF
+        cluster = self.table[idx].tolist()
+
+        replace = None
+        worst = None
+        for i, (k16, _, _, _, gen_bound, d8) in enumerate(cluster):
+            if not d8 or k16 == key16:
+                replace = i
+                break
+            # ganti entry dengan (depth - 2 * umur) terkecil: dangkal dan/atau tua
+            score = d8 - 2 * self._relative_age(gen_bound)
+            if worst is None or score < worst:
+                worst = score
+                replace = i
+
+        self.table[idx, replace] = (
+            key16,
+            encode_move(move),
+            value_to_tt(cp),
+            EVAL_NONE,
+            self.generation | BOUND_EXACT,
+            depth + 1,
+        )
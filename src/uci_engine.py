@@ -1,82 +1,673 @@
+import atexit
+import collections
+import logging
+import os
 import subprocess
+import threading
+import queue
 import time
-import re
-from typing import List, Tuple, Optional
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, wait
+# a separate class before Python 3.11 (only an alias of the built-in TimeoutError since)
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple, Optional
+import chess
+
+from .tt import value_to_tt
+
+log = logging.getLogger(__name__)
+
+# os.writev is POSIX-only; Windows falls back to one joined write
+_HAS_WRITEV = hasattr(os, "writev")
+
+_SCORE_TOKEN = " score "
+
+# frequent commands, encoded once
+_CMD_ISREADY = b"isready\n"
+_CMD_UCINEWGAME = b"ucinewgame\n"
+_CMD_GO = b"go\n"
+_CMD_STOP = b"stop\n"
+# how long a timed-out search gets to answer "stop" with bestmove before it is dropped
+_STOP_GRACE_S = 0.5
+# encoded "go movetime X" / "go depth X", memoized by X (only a handful of values per run)
+_GO_MOVETIME_CACHE: Dict[int, bytes] = {}
+_GO_DEPTH_CACHE: Dict[int, bytes] = {}
+# encoded "setoption name MultiPV value K", sent in front of a go that needs another K
+_MULTIPV_CACHE: Dict[int, bytes] = {}
+
+
+def _go_bytes(movetime_ms: Optional[int], depth: Optional[int], searchmoves: Optional[List[str]]) -> bytes:
+    if searchmoves:
+        # candidate lists differ every call, not worth caching
+        if movetime_ms is not None:
+            cmd = f"go movetime {movetime_ms}"
+        elif depth is not None:
+            cmd = f"go depth {depth}"
+        else:
+            cmd = "go"
+        return (cmd + " searchmoves " + " ".join(searchmoves) + "\n").encode("ascii")
+    if movetime_ms is not None:
+        buf = _GO_MOVETIME_CACHE.get(movetime_ms)
+        if buf is None:
+            buf = _GO_MOVETIME_CACHE[movetime_ms] = f"go movetime {movetime_ms}\n".encode("ascii")
+        return buf
+    if depth is not None:
+        buf = _GO_DEPTH_CACHE.get(depth)
+        if buf is None:
+            buf = _GO_DEPTH_CACHE[depth] = f"go depth {depth}\n".encode("ascii")
+        return buf
+    return _CMD_GO
+
+
+def _multipv_bytes(n_pv: int) -> bytes:
+    buf = _MULTIPV_CACHE.get(n_pv)
+    if buf is None:
+        buf = _MULTIPV_CACHE[n_pv] = f"setoption name MultiPV value {n_pv}\n".encode("ascii")
+    return buf
+
+
+def _atoi(s: str) -> Optional[int]:
+    """
+    Leading "-?digits" token of s as an int, or None if it isn't one.
+    Validated up front so malformed scores cost no exception; the conversion itself
+    stays int(), CPython's C path, which beats a Python-level digit loop on short numerals.
+    """
+    tok = s.partition(" ")[0]
+    if tok.isdigit() or (tok[:1] == "-" and tok[1:].isdigit()):
+        return int(tok)
+    return None
+
+
+class _Search:
+    """
+    One in-flight `go`. The reader thread feeds it every info/bestmove line
+    and resolves `future` once bestmove arrives.
+    """
+
+    def __init__(self, multipv: bool):
+        self.multipv = multipv
+        self.future: Future = Future()
+        # set by _abort_search before it sends stop: the bestmove that follows is a
+        # truncated result, so the future fails instead (and nothing is cached)
+        self.aborted = False
+        self.bestmove = "(none)"
+        self.cp_score: int = 0
+        self.mate_score: Optional[int] = None
+        # MultiPV: latest (first_pv_move, cp) per multipv index. Each new depth overwrites
+        # indices 1..K, so moves that drop out of the top K don't keep a stale shallow score
+        self.pvs: Dict[int, Tuple[str, int]] = {}
+
+    def feed(self, line: str) -> bool:
+        """
+        Parse one engine line. Return True when the search is finished.
+        """
+        # plain string scans instead of a regex: feed() runs for every info line.
+        # dispatch on the first character, so info lines never touch the bestmove check
+        c = line[:1]
+        if c == "i" and line[1:5] == "nfo ":
+            i = line.find(_SCORE_TOKEN)
+            if i >= 0:
+                # "... score cp 13 ..." / "... score mate -3 ..."
+                kind, _, rest = line[i + 7:].partition(" ")
+                val = _atoi(rest)
+                if val is None:
+                    return False
+                # aspiration fail-high/low: only a bound, not the move's score
+                if " lowerbound" in line or " upperbound" in line:
+                    return False
+                if kind == "cp":
+                    cp_score = val
+                elif kind == "mate":
+                    # mate in n -> +/-(CP_MAX - plies), the scale the TT and eval_board use,
+                    # so every score this module returns compares with every other
+                    cp_score = value_to_tt(0, val)
+                else:
+                    return False
+
+                if self.multipv:
+                    j = line.find(" pv ")
+                    if j >= 0:
+                        pv = line[j + 4:].partition(" ")[0]
+                        if pv:
+                            k = line.find(" multipv ")
+                            index = _atoi(line[k + 9:]) if k >= 0 else 1
+                            self.pvs[index or 1] = (pv, cp_score)
+                # with MultiPV > 1 only the principal line (multipv 1) is the engine's eval
+                elif " multipv " not in line or " multipv 1 " in line:
+                    self.cp_score = cp_score
+                    self.mate_score = None if kind == "cp" else val
+            return False
+        if c == "b" and line[1:8] == "estmove":
+            if line[8:9] == " ":
+                self.bestmove = line[9:].partition(" ")[0]
+            return True
+        return False
+
+    def result(self):
+        if self.multipv:
+            # a move can sit at two indices if the search stopped mid-iteration;
+            # lower index (newer line) wins
+            return {pv: cp for pv, cp in (self.pvs[k] for k in sorted(self.pvs, reverse=True))}
+        return self.cp_score, self.mate_score, self.bestmove
+
+
+def available_cpus() -> List[int]:
+    """
+    Cores this process may run on, for spreading pinned engines round-robin.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+# Process-wide round-robin cursor over available_cpus(), so engines of
+# different pools land on different cores instead of all starting at cpus[0].
+_cpu_cursor = 0
+_cpu_cursor_lock = threading.Lock()
+
+
+def next_cpu() -> int:
+    """
+    Next core to pin an engine to, continuing where the previous pool left off.
+    """
+    global _cpu_cursor
+    cpus = available_cpus()
+    with _cpu_cursor_lock:
+        cpu = cpus[_cpu_cursor % len(cpus)]
+        _cpu_cursor += 1
+    return cpu
+
+
+# Running engines keyed by (executable path, name), see UCIEngine.get.
+# Reused across runs so batch jobs don't pay engine start-up per run.
+_engine_cache: Dict[Tuple[str, str], "UCIEngine"] = {}
+_engine_cache_lock = threading.Lock()
+
+
+def get_default_engine(path: str, name: str = "default", **opts) -> "UCIEngine":
+    """
+    Process-wide engine for path, spawned once (NNUE loaded once) and shared by every
+    caller and thread for the rest of the run: UCIEngine.get under the name "default",
+    so opts only apply when the process is spawned.
+    Hold engine.lock around multi-call sequences; quit happens at exit.
+    """
+    return UCIEngine.get(path, name=name, **opts)
+
 
 class UCIEngine:
     """
-    Minimal synchronous UCI wrapper.
+    Minimal UCI wrapper.
     Assumes engine is a local executable (ex: stockfish.exe).
+    A background reader thread consumes engine output: lines belonging to a
+    running search are parsed as they arrive and resolve that search's Future,
+    everything else is queued for _read_lines_until.
+    Nothing polls the pipe: the reader blocks in readline, callers block on
+    Queue.get / Future.result with a deadline, so waiting on the engine costs no CPU.
     """
 
-    def __init__(self, path: str, name: str = "engine"):
+    def __init__(self,
+                 path: str,
+                 name: str = "engine",
+                 hash_mb: int = 256,
+                 threads: int = 1,
+                 cache_size: int = 50_000,
+                 verbose_info: bool = False,
+                 cpu_id: Optional[int] = None,
+                 nice: int = 0,
+                 debug: bool = False):
+        """
+        cache_size   : max search results kept in the LRU result cache (0 disables it)
+        verbose_info : keep the engine's analysis-mode output; False trims it (see below)
+        cpu_id       : pin the engine process to this core (Linux only; None = no pinning)
+        nice         : scheduling niceness for the engine process (POSIX only; 0 = unchanged)
+        debug        : merge the engine's stderr into stdout and log every line at DEBUG;
+                       otherwise stderr goes to /dev/null and only UCI output is parsed
+        """
         self.path = path
         self.name = name
+        self.debug = debug
+
+        # LRU of search results: (position, movetime_ms, depth, multipv, n_pv, searchmoves) -> result
+        self._cache: "collections.OrderedDict[tuple, object]" = collections.OrderedDict()
+        self._cache_max = cache_size
+        self._cache_lock = threading.Lock()
+        # (fen, moves) from the last position_fen, sent together with the next go
+        self._pending: Optional[Tuple[str, Tuple[str, ...]]] = None
+        # MultiPV currently set in the engine; each search sends its own only if it differs
+        self._multipv: Optional[int] = None
+        # UCI is single-consumer: hold this around multi-call sequences on a shared engine
+        # (position_fen + go_and_get); every single command (search, setoption, isready,
+        # ucinewgame, clear_hash) takes it itself
+        self.lock = threading.RLock()
+        self._closed = False
 
         # start process
         self.proc = subprocess.Popen(
             [self.path],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            # stderr (NNUE load messages, warnings) is only worth reading when debugging
+            stderr=subprocess.STDOUT if debug else subprocess.DEVNULL,
+            # binary pipes with a large buffer: lines are decoded as ASCII by hand,
+            # no TextIOWrapper / incremental decoder per line
+            bufsize=1 << 16
         )
+        self._set_scheduling(cpu_id, nice)
+        # never leave a Stockfish process behind, even if the caller forgets quit()
+        atexit.register(self.quit)
 
-        # init UCI
+        # engine output -> reader thread (line buffer reused across reads, see _iter_lines)
+        self._buf = bytearray()
+        self._events: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._search: Optional[_Search] = None
+        # aborted searches whose bestmove hasn't arrived yet: the reader drops that many
+        # bestmoves (and the info lines before each) so they can't answer a newer search;
+        # _wait_idle holds new commands back until they are through (notified on _search_cond)
+        self._stale = 0
+        self._search_cond = threading.Condition(threading.Lock())
+        self._reader = threading.Thread(target=self._reader_loop, name=f"{name}-reader", daemon=True)
+        self._reader.start()
+
+        # init UCI, remembering which options the engine advertises
+        self.options: Set[str] = set()
         self._write("uci")
-        self._read_until("uciok")
+        self._read_lines_until("uciok", self._parse_option)
 
         # make sure it's ready
-        self._write("isready")
-        self._read_until("readyok")
+        self.isready()
+
+        # one-shot init options: set once per process, not per run
+        self.setoption("Threads", str(threads))
+        # keep a large engine-side hash so related searches (siblings, transpositions)
+        # can reuse what earlier searches stored; it lives as long as the process
+        # (see ucinewgame / clear_hash for the only places it is dropped)
+        self.setoption("Hash", str(hash_mb))
+
+        # less output per search = fewer lines to read, decode and parse:
+        # single PV (multi-PV searches pass their own n_pv), no WDL stats, no pondering
+        self.setoption("MultiPV", "1")
+        self._setoption_if_supported("UCI_ShowWDL", "false")
+        self._setoption_if_supported("Ponder", "false")
+        if not verbose_info:
+            self._setoption_if_supported("UCI_AnalyseMode", "false")
+
+    def _parse_option(self, line: str):
+        # "option name <Name with spaces> type <t> ..."
+        if line[:12] == "option name ":
+            self.options.add(line[12:].partition(" type ")[0])
+
+    def _setoption_if_supported(self, name: str, value: str):
+        # unknown options only make the engine print "No such option"
+        if name in self.options:
+            self.setoption(name, value)
+
+    def _set_scheduling(self, cpu_id: Optional[int], nice: int):
+        # pinned engines keep their TT warm in one core's caches; both hints are best effort
+        try:
+            if cpu_id is not None and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(self.proc.pid, {cpu_id})
+            if nice and hasattr(os, "setpriority"):
+                os.setpriority(os.PRIO_PROCESS, self.proc.pid, nice)
+        except OSError:
+            pass
+
+    @classmethod
+    def get(cls, path: str, name: str = "engine", **kwargs) -> "UCIEngine":
+        """
+        Return the cached engine for (path, name), spawning it on first use.
+        kwargs (constructor options: hash_mb, threads, ...) only apply when a new process is spawned.
+        A reused engine is synced with isready before it is handed out;
+        cached engines are quit at interpreter exit.
+        """
+        key = (path, name)
+        with _engine_cache_lock:
+            engine = _engine_cache.get(key)
+            if engine is not None and engine.proc.poll() is None:
+                engine.isready()
+                return engine
+            engine = cls(path, name=name, **kwargs)
+            _engine_cache[key] = engine
+            return engine
 
     def _write(self, cmd: str):
+        self._write_bytes(cmd.encode("ascii") + b"\n")
+
+    def _write_many(self, *cmds: str):
+        # several commands, one syscall (one wake-up of the engine)
+        self._write_bytes(*[c.encode("ascii") + b"\n" for c in cmds])
+
+    def _write_bytes(self, *bufs: bytes):
+        # already-encoded, newline-terminated commands (see _CMD_* / _go_bytes)
         assert self.proc.stdin is not None
-        self.proc.stdin.write(cmd + "\n")
-        self.proc.stdin.flush()
+        if len(bufs) == 1:
+            self.proc.stdin.write(bufs[0])
+            self.proc.stdin.flush()
+        elif _HAS_WRITEV:
+            # gather write from the separate buffers, no joined copy; the Python-side
+            # buffer is always empty here (every write flushes) but flush to keep ordering safe
+            self.proc.stdin.flush()
+            fd = self.proc.stdin.fileno()
+            total = sum(len(b) for b in bufs)
+            written = os.writev(fd, bufs)
+            if written < total:
+                # short write (pipe full / signal): send the rest the plain way
+                rest = memoryview(b"".join(bufs))[written:]
+                while rest:
+                    rest = rest[os.write(fd, rest):]
+        else:
+            self.proc.stdin.write(b"".join(bufs))
+            self.proc.stdin.flush()
 
-    def _read_until(self, token: str, timeout: float = 10.0) -> List[str]:
+    def _iter_lines(self):
+        """
+        Split engine output into lines over one reused bytearray filled by os.read:
+        one allocation per 64 KiB chunk instead of one bytes object per readline.
+        Only the reader thread reads stdout, so bypassing the buffered reader is safe.
+        """
         assert self.proc.stdout is not None
-        start = time.time()
-        lines: List[str] = []
+        fd = self.proc.stdout.fileno()
+        buf = self._buf
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                break
+            buf += chunk
+            start = 0
+            with memoryview(buf) as mv:
+                while True:
+                    nl = buf.find(b"\n", start)
+                    if nl < 0:
+                        break
+                    # rstrip drops the "\r" of engines that write CRLF (Windows builds)
+                    yield str(mv[start:nl], "ascii", "replace").rstrip("\r")
+                    start = nl + 1
+            del buf[:start]
+        if buf:
+            yield buf.decode("ascii", "replace").rstrip("\r")
+            buf.clear()
+
+    def _reader_loop(self):
+        for line in self._iter_lines():
+            if self.debug:
+                log.debug("%s> %s", self.name, line)
+            c = line[:1]
+            if c == "i" and line[1:5] == "nfo ":
+                # until the stale bestmoves are through, every info line is theirs
+                if self._stale:
+                    continue
+                search = self._search
+                if search is not None:
+                    search.feed(line)
+                    continue
+            elif c == "b" and line[1:8] == "estmove":
+                with self._search_cond:
+                    if self._stale:
+                        self._stale -= 1
+                        self._search_cond.notify_all()
+                        continue
+                    search = self._search
+                    self._search = None
+                if search is not None:
+                    search.feed(line)
+                    try:
+                        if search.aborted:
+                            search.future.set_exception(TimeoutError(f"{self.name}: search stopped"))
+                        else:
+                            search.future.set_result(search.result())
+                    except InvalidStateError:
+                        pass  # already failed by _abort_search
+                    continue
+            self._events.put(line)
+
+        # EOF: engine exited
+        search = self._search
+        if search is not None:
+            self._search = None
+            try:
+                search.future.set_exception(EOFError(f"{self.name}: engine exited during search"))
+            except InvalidStateError:
+                pass
+        self._events.put(None)
+
+    def _read_lines_until(self,
+                          token: str,
+                          on_line: Optional[Callable[[str], None]] = None,
+                          timeout: float = 10.0):
+        """
+        Consume queued (non-search) lines up to and including the one containing token,
+        handing each to on_line as it arrives instead of collecting them.
+        """
+        # monotonic deadline computed once; the clock is read only when the queue is empty
+        # (to block with the remaining time) and every 64 lines otherwise
+        deadline = time.monotonic() + timeout
+        i = 0
         while True:
-            if time.time() - start > timeout:
+            if not (i & 63) and time.monotonic() > deadline:
                 raise TimeoutError(f"{self.name}: timeout waiting for '{token}'")
-            line = self.proc.stdout.readline()
-            if not line:
-                continue
-            line = line.rstrip("\n")
-            lines.append(line)
+            i += 1
+            try:
+                line = self._events.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.name}: timeout waiting for '{token}'")
+                try:
+                    line = self._events.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"{self.name}: timeout waiting for '{token}'")
+            if line is None:
+                raise EOFError(f"{self.name}: engine exited while waiting for '{token}'")
+            if on_line is not None:
+                on_line(line)
             if token in line:
-                return lines
+                return
 
-    def setoption(self, name: str, value: str):
+    def setoption(self, name: str, value: str, timeout: float = 10.0):
         # e.g. set Threads, Hash, etc
-        self._write(f"setoption name {name} value {value}")
+        # under the lock and after the running search: an option must not change mid-search
+        with self.lock:
+            self._wait_idle(timeout)
+            self._write(f"setoption name {name} value {value}")
+            if name == "MultiPV":
+                self._multipv = int(value)
+            # other options can change what a search returns (MultiPV is part of the key)
+            self.clear_cache()
 
-    def ucinewgame(self):
-        self._write("ucinewgame")
-        self._write("isready")
-        self._read_until("readyok")
+    def clear_cache(self):
+        """
+        Drop all cached search results (the engine's own hash is untouched).
+        """
+        with self._cache_lock:
+            self._cache.clear()
 
-    def position_fen(self, fen: str, moves: Optional[List[str]] = None):
+    def _cache_store(self, key: tuple, future: "Future"):
+        # failed and stopped searches (see _abort_search) are never cached
+        if future.exception() is not None:
+            return
+        with self._cache_lock:
+            self._cache[key] = future.result()
+            if len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+
+    def isready(self, timeout: float = 10.0):
+        with self.lock:
+            self._wait_idle(timeout)
+            self._write_bytes(_CMD_ISREADY)
+            self._read_lines_until("readyok", timeout=timeout)
+
+    def ucinewgame(self, timeout: float = 10.0):
+        """
+        Tell the engine the next search is from a different game; Stockfish clears its
+        hash on this. Call only between unrelated games, never between sibling or
+        candidate positions of one search, or every later search starts from an empty hash.
+        """
+        with self.lock:
+            self._wait_idle(timeout)
+            self._write_bytes(_CMD_UCINEWGAME, _CMD_ISREADY)
+            self._read_lines_until("readyok", timeout=timeout)
+
+    def clear_hash(self, timeout: float = 10.0):
+        """
+        Explicitly empty the engine's hash ("Clear Hash" button option) and wait for it.
+        """
+        with self.lock:
+            self._wait_idle(timeout)
+            self._write_many("setoption name Clear Hash", "isready")
+            self._read_lines_until("readyok", timeout=timeout)
+
+    @staticmethod
+    def _position_cmd(fen: str, moves: Optional[List[str]] = None) -> str:
         if moves:
-            ms = " ".join(moves)
-            self._write(f"position fen {fen} moves {ms}")
-        else:
-            self._write(f"position fen {fen}")
+            return f"position fen {fen} moves {' '.join(moves)}"
+        return f"position fen {fen}"
+
+    @staticmethod
+    def board_position(board: chess.Board) -> Tuple[str, Optional[List[str]]]:
+        """
+        (root_fen, moves) for a board: its move stack from the root, so the engine sees
+        the real line from the search root (history, repetitions) instead of an unrelated FEN.
+        """
+        if board.move_stack:
+            return board.root().fen(), [m.uci() for m in board.move_stack]
+        return board.fen(), None
+
+    def position_fen(self, fen: str, moves: Optional[List[str]] = None):
+        """
+        Only records the position: the "position" command goes out with the next go
+        (and not at all if that search is answered from the result cache).
+        """
+        self._pending = (fen, tuple(moves or ()))
+
+    def position_board(self, board: chess.Board):
+        """
+        Send the board as "position fen <root_fen> moves <m1 m2 ...>" (see board_position).
+        """
+        self.position_fen(*self.board_position(board))
+
+    def _start_search(self,
+                      multipv: bool,
+                      movetime_ms: Optional[int] = None,
+                      depth: Optional[int] = None,
+                      searchmoves: Optional[List[str]] = None,
+                      n_pv: int = 1,
+                      timeout: float = 10.0
+                      ) -> "Future":
+        # cache check + wait + write as one unit: the engine may be shared by threads
+        with self.lock:
+            pending = self._pending
+            key = (pending, movetime_ms, depth, multipv, n_pv, tuple(searchmoves) if searchmoves else None)
+            if self._cache_max:
+                with self._cache_lock:
+                    hit = self._cache.get(key)
+                    if hit is not None:
+                        self._cache.move_to_end(key)
+                if hit is not None:
+                    # same search as before: answer from memory, no UCI exchange
+                    future: Future = Future()
+                    future.set_result(hit)
+                    return future
+
+            # one search per engine at a time: the previous one must reach bestmove first
+            self._wait_idle(timeout)
+            search = _Search(multipv)
+            self._search = search
+            if self._cache_max:
+                search.future.add_done_callback(lambda f: self._cache_store(key, f))
+
+            # "[setoption MultiPV]\nposition ...\ngo ..." in a single write
+            bufs = []
+            if n_pv != self._multipv:
+                bufs.append(_multipv_bytes(n_pv))
+                self._multipv = n_pv
+            if pending is not None:
+                bufs.append(self._position_cmd(pending[0], list(pending[1])).encode("ascii") + b"\n")
+            bufs.append(_go_bytes(movetime_ms, depth, searchmoves))
+            self._write_bytes(*bufs)
+
+            return search.future
+
+    def _wait_idle(self, timeout: float = 10.0):
+        """
+        Wait for the running search (if any) to reach bestmove. If it doesn't within
+        timeout, it is stopped and dropped (see _abort_search) and TimeoutError is raised,
+        so the engine is usable again by the next call.
+        Also waits for the bestmove of earlier aborted searches, so no new go is sent
+        while one is still owed; if it doesn't come within timeout the engine lost it.
+        """
+        search = self._search
+        if search is not None:
+            done, _ = wait([search.future], timeout)
+            if not done:
+                self._abort_search(search)
+                raise TimeoutError(f"{self.name}: previous search did not finish within {timeout}s")
+        if self._stale:
+            with self._search_cond:
+                if not self._search_cond.wait_for(lambda: not self._stale, timeout):
+                    log.warning("%s: no bestmove for %d aborted search(es), dropping them",
+                                self.name, self._stale)
+                    self._stale = 0
+
+    def _abort_search(self, search: _Search):
+        # ask for bestmove now; if the engine doesn't answer even that, forget the search
+        # and count it as stale, so its late info/bestmove lines are dropped by the reader
+        search.aborted = True
+        try:
+            self._write_bytes(_CMD_STOP)
+        except OSError:
+            pass
+        done, _ = wait([search.future], _STOP_GRACE_S)
+        if not done:
+            with self._search_cond:
+                if self._search is search:
+                    self._search = None
+                    self._stale += 1
+            try:
+                search.future.set_exception(TimeoutError(f"{self.name}: search aborted"))
+            except InvalidStateError:
+                pass
+
+    def wait_result(self, future: "Future", timeout: float = 10.0):
+        """
+        future.result(timeout) for a Future from one of the *_async calls; on timeout the
+        search is stopped and dropped before the built-in TimeoutError is raised, so later
+        calls don't hang.
+        """
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            search = self._search
+            if search is not None and search.future is future:
+                self._abort_search(search)
+            raise TimeoutError(f"{self.name}: search did not finish within {timeout}s") from None
+
+    def go_and_get_async(self,
+                         movetime_ms: Optional[int] = None,
+                         depth: Optional[int] = None,
+                         searchmoves: Optional[List[str]] = None,
+                         timeout: float = 10.0
+                         ) -> "Future":
+        """
+        Send `go` and return at once with a Future that the reader thread resolves
+        on `bestmove` to (cp_score, mate_score, bestmove), see go_and_get.
+        The caller can do other work (e.g. drive a second engine) meanwhile.
+        timeout bounds the wait for a previous search; collect with wait_result.
+        """
+        return self._start_search(False, movetime_ms=movetime_ms, depth=depth, searchmoves=searchmoves,
+                                  timeout=timeout)
 
     def go_and_get(self,
                    movetime_ms: Optional[int] = None,
-                   depth: Optional[int] = None
+                   depth: Optional[int] = None,
+                   timeout: float = 10.0,
+                   searchmoves: Optional[List[str]] = None
                    ) -> Tuple[int, Optional[int], str]:
         """
         Return:
           (cp_score, mate_score, bestmove)
-        cp_score  : centipawn eval from side-to-move POV
+        cp_score  : centipawn eval from side-to-move POV; a mate is +/-(32000 - plies to mate)
+                    (tt.value_to_tt), the same scale as StockfishFilter.eval_board
         mate_score: moves to mate (if mate found) or None
         bestmove  : bestmove in UCI notation
+        searchmoves (optional) restricts the root moves searched, "go ... searchmoves m1 m2".
         """
         # Note on time complexity:
         # The actual search work is performed by the external UCI engine (e.g. Stockfish).
@@ -85,43 +676,214 @@ class UCIEngine:
         # With alpha-beta and good move ordering the effective complexity can approach O(b^(d/2)) in best cases.
         # When movetime_ms is used the engine decides how much depth to search within that time.
         # We denote a single engine evaluation cost as T_sf(depth) to emphasize it depends on chosen depth/time.
+        return self.wait_result(
+            self.go_and_get_async(movetime_ms=movetime_ms, depth=depth, searchmoves=searchmoves, timeout=timeout),
+            timeout)
 
-        if movetime_ms is not None:
-            self._write(f"go movetime {movetime_ms}")
-        elif depth is not None:
-            self._write(f"go depth {depth}")
-        else:
-            self._write("go")
-
-        lines = self._read_until("bestmove")
-        bestmove = "(none)"
-        cp_score: int = 0
-        mate_score: Optional[int] = None
-        score_re = re.compile(r"score (cp|mate) (-?\d+)")
-
-        for line in lines:
-            if line.startswith("info "):
-                m = score_re.search(line)
-                if m:
-                    kind, val = m.group(1), int(m.group(2))
-                    if kind == "cp":
-                        cp_score = val
-                        mate_score = None
-                    else:
-                        mate_score = val
-                        # convert mate score into a very large cp magnitude so ordering still works
-                        cp_score = 100000 if val > 0 else -100000
-            if line.startswith("bestmove"):
-                parts = line.split()
-                if len(parts) >= 2:
-                    bestmove = parts[1]
-
-        return cp_score, mate_score, bestmove
+    def go_multipv_async(self,
+                         movetime_ms: Optional[int] = None,
+                         depth: Optional[int] = None,
+                         searchmoves: Optional[List[str]] = None,
+                         n_pv: int = 1,
+                         timeout: float = 10.0
+                         ) -> "Future":
+        """
+        Like go_and_get_async, but the Future resolves to the go_multipv dict.
+        """
+        return self._start_search(True, movetime_ms=movetime_ms, depth=depth, searchmoves=searchmoves,
+                                  n_pv=n_pv, timeout=timeout)
+
+    def go_multipv(self,
+                   movetime_ms: Optional[int] = None,
+                   depth: Optional[int] = None,
+                   timeout: float = 10.0,
+                   searchmoves: Optional[List[str]] = None,
+                   n_pv: int = 1
+                   ) -> Dict[str, int]:
+        """
+        Run a single search with MultiPV = n_pv and collect every PV it reports.
+        n_pv applies to this search only: "setoption name MultiPV" goes out in the same
+        write as the go, and only when it differs from the engine's current value.
+        Return:
+          {first_pv_move: cp_score}
+        cp_score is from side-to-move POV at the searched position,
+        mate scores are mapped to +/-(32000 - plies) like go_and_get.
+        Only the latest line per multipv index counts (so at most MultiPV entries, all
+        from the newest depth); lowerbound/upperbound lines are ignored.
+        The dict may be shared with the result cache: treat it as read-only.
+        searchmoves restricts the search (and so the reported PVs) to those UCI moves.
+        """
+        return self.wait_result(
+            self.go_multipv_async(movetime_ms=movetime_ms, depth=depth, searchmoves=searchmoves,
+                                  n_pv=n_pv, timeout=timeout),
+            timeout)
+
+    def position_and_go_async(self,
+                              fen: str,
+                              moves: Optional[List[str]] = None,
+                              movetime_ms: Optional[int] = None,
+                              depth: Optional[int] = None,
+                              searchmoves: Optional[List[str]] = None,
+                              multipv: bool = False,
+                              n_pv: int = 1,
+                              timeout: float = 10.0
+                              ) -> "Future":
+        """
+        position_fen + go in one pipe write. The Future resolves like
+        go_multipv_async (with MultiPV = n_pv) if multipv, else like go_and_get_async.
+        """
+        with self.lock:
+            self.position_fen(fen, moves)
+            return self._start_search(multipv, movetime_ms=movetime_ms, depth=depth, searchmoves=searchmoves,
+                                      n_pv=n_pv if multipv else 1, timeout=timeout)
+
+    def position_and_go(self,
+                        fen: str,
+                        moves: Optional[List[str]] = None,
+                        movetime_ms: Optional[int] = None,
+                        depth: Optional[int] = None,
+                        timeout: float = 10.0,
+                        searchmoves: Optional[List[str]] = None
+                        ) -> Tuple[int, Optional[int], str]:
+        """
+        position_fen + go_and_get with a single write; same return value as go_and_get.
+        """
+        return self.wait_result(
+            self.position_and_go_async(fen, moves, movetime_ms=movetime_ms, depth=depth,
+                                       searchmoves=searchmoves, timeout=timeout),
+            timeout)
+
+    def go_with_searchmoves(self,
+                            board: chess.Board,
+                            moves: Optional[List[str]],
+                            movetime_ms: Optional[int] = None,
+                            depth: Optional[int] = None,
+                            timeout: float = 10.0,
+                            n_pv: Optional[int] = None
+                            ) -> Dict[str, int]:
+        """
+        Score exactly `moves` (UCI) at `board` in one search:
+        "go ... searchmoves m1 .. mK" with the go_multipv output.
+        n_pv (MultiPV for this search) defaults to len(moves), a score for every move.
+        moves=None searches all legal moves (plain MultiPV search, n_pv lines).
+        Return:
+          {uci_move: cp_score} (side-to-move POV at board)
+        """
+        fen, stack = self.board_position(board)
+        return self.wait_result(
+            self.position_and_go_async(fen, stack, movetime_ms=movetime_ms, depth=depth,
+                                       searchmoves=moves, multipv=True,
+                                       n_pv=n_pv or len(moves or ()) or 1, timeout=timeout),
+            timeout)
+
+    def __enter__(self) -> "UCIEngine":
+        return self
+
+    def __exit__(self, *exc):
+        self.quit()
 
     def quit(self):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.quit)
+        with _engine_cache_lock:
+            if _engine_cache.get((self.path, self.name)) is self:
+                del _engine_cache[(self.path, self.name)]
         try:
             self._write("quit")
         except Exception:
             pass
         if self.proc:
             self.proc.terminate()
+
+
+class UCIEnginePool:
+    """
+    N independent engines (Threads=1 each) for scoring many positions in parallel.
+    A slot is handed to whichever task is free; the GIL is released while the
+    calling threads block on the engines, so searches overlap across cores.
+    By default the pool owns its engines and quit() stops them. With shared=True
+    the engines come from UCIEngine.get (named "<name>-<i>"), so a pool rebuilt
+    later in the run reuses the same processes; quit() then leaves them running
+    and they are quit at exit. With pin_cpus, engines are pinned round-robin via
+    next_cpu(), continuing across pools.
+
+    Subclasses group engines into other slot types by overriding _make_slots
+    and _slot_engine (see engine_pool.EnginePool).
+    """
+
+    def __init__(self,
+                 path: str,
+                 n: int = 2,
+                 name: str = "uci-pool",
+                 pin_cpus: bool = True,
+                 shared: bool = False,
+                 **engine_kwargs):
+        engine_kwargs.setdefault("threads", 1)
+        self.shared = shared
+        factory = UCIEngine.get if shared else UCIEngine
+        self.engines: List[UCIEngine] = [
+            factory(path, name=f"{name}-{i}",
+                    cpu_id=next_cpu() if pin_cpus else None,
+                    **engine_kwargs)
+            for i in range(max(1, n))
+        ]
+        self.slots: List[Any] = self._make_slots(self.engines)
+        self._free: "queue.Queue[Any]" = queue.Queue()
+        for slot in self.slots:
+            self._free.put(slot)
+
+    def _make_slots(self, engines: List[UCIEngine]) -> List[Any]:
+        return list(engines)
+
+    def _slot_engine(self, slot: Any) -> UCIEngine:
+        return slot
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def acquire(self) -> Any:
+        return self._free.get()
+
+    def release(self, slot: Any):
+        self._free.put(slot)
+
+    def map(self, fn: Callable[[Any, Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Run fn(slot, item) for every item in parallel, one task per slot at a time.
+        Results come back in input order.
+        """
+        def task(item):
+            slot = self.acquire()
+            try:
+                return fn(slot, item)
+            finally:
+                self.release(slot)
+
+        with ThreadPoolExecutor(max_workers=len(self.slots)) as ex:
+            return list(ex.map(task, items))
+
+    def go_and_get_batch(self,
+                         positions: List[Tuple[str, Optional[List[str]]]],
+                         movetime_ms: Optional[int] = None,
+                         depth: Optional[int] = None,
+                         timeout: float = 10.0
+                         ) -> List[Tuple[int, Optional[int], str]]:
+        """
+        Search every (fen, moves) in positions, spread over the pool's engines.
+        Return one go_and_get result per position, in input order.
+        Wall time ~ len(positions) / len(pool) * T_sf instead of len(positions) * T_sf.
+        """
+        def task(slot: Any, pos: Tuple[str, Optional[List[str]]]):
+            fen, moves = pos
+            return self._slot_engine(slot).position_and_go(
+                fen, moves, movetime_ms=movetime_ms, depth=depth, timeout=timeout)
+
+        return self.map(task, positions)
+
+    def quit(self):
+        if self.shared:
+            return
+        for engine in self.engines:
+            engine.quit()
@@ -17,9 +17,18 @@ for _ in range(20):
     if "uciok" in line:
         break
 
-proc.stdin.write("position startpos\n")
-proc.stdin.write("go depth 8\n")
+# position + go dalam satu write, lalu baca sampai bestmove (bukan jumlah baris tetap)
+proc.stdin.write("position startpos\ngo depth 8\n")
 proc.stdin.flush()
 
-for _ in range(30):
-    print(proc.stdout.readline().strip())
\ No newline at end of file
+while True:
+    line = proc.stdout.readline()
+    if not line:  # engine keluar
+        break
+    print(line.strip())
+    if line.startswith("bestmove"):
+        break
+
+proc.stdin.write("quit\n")
+proc.stdin.flush()
+proc.wait()